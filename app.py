@@ -1,23 +1,29 @@
 import os
 import re
+import importlib.util
+import http.cookiejar
 import random
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import streamlit as st
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Multiple AI providers support
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+def sdk_available(module_name: str) -> bool:
+    """Check whether an optional SDK is installed without importing it"""
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except ModuleNotFoundError:
+        return False
 
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# google.generativeai pulls in grpc/protobuf, so it is only imported on the
+# first quiz generation rather than on every cold start. OpenAI and Kimi are
+# called over their REST APIs and need no SDK.
+GEMINI_AVAILABLE = sdk_available("google.generativeai")
 
 # ---------------------------
 # Page config
@@ -31,6 +37,8 @@ st.set_page_config(
 # ---------------------------
 # API Configuration
 # ---------------------------
+# Provider setup runs once per process; reboot the app after changing API keys
+@st.cache_resource(show_spinner=False)
 def configure_ai_providers():
     """Configure available AI providers"""
     providers = {}
@@ -39,25 +47,16 @@ def configure_ai_providers():
     if GEMINI_AVAILABLE:
         gemini_key = st.secrets.get("gemini_api_key", os.getenv("GEMINI_API_KEY"))
         if gemini_key:
-            try:
-                genai.configure(api_key=gemini_key)
-                providers["Gemini"] = {"key": gemini_key, "status": "✅ Active"}
-            except Exception as e:
-                providers["Gemini"] = {"key": None, "status": f"❌ Error: {e}"}
+            providers["Gemini"] = {"key": gemini_key, "status": "✅ Active"}
         else:
             providers["Gemini"] = {"key": None, "status": "❌ No API key"}
     
     # OpenAI API (for comparison)
-    if OPENAI_AVAILABLE:
-        openai_key = st.secrets.get("openai_api_key", os.getenv("OPENAI_API_KEY"))
-        if openai_key:
-            try:
-                openai.api_key = openai_key
-                providers["OpenAI"] = {"key": openai_key, "status": "✅ Active"}
-            except Exception as e:
-                providers["OpenAI"] = {"key": None, "status": f"❌ Error: {e}"}
-        else:
-            providers["OpenAI"] = {"key": None, "status": "❌ No API key"}
+    openai_key = st.secrets.get("openai_api_key", os.getenv("OPENAI_API_KEY"))
+    if openai_key:
+        providers["OpenAI"] = {"key": openai_key, "status": "✅ Active"}
+    else:
+        providers["OpenAI"] = {"key": None, "status": "❌ No API key"}
     
     # Moonshot (Kimi) API - Free tier with high limits
     kimi_key = st.secrets.get("kimi_api_key", os.getenv("KIMI_API_KEY"))
@@ -85,6 +84,8 @@ st.write(
 # Sidebar - AI Provider Status
 # ---------------------------
 providers = configure_ai_providers()
+# Sidebar choice that races every configured provider
+AUTO_PROVIDER = "Auto (fastest)"
 
 with st.sidebar:
     st.header("🤖 AI Provider Status")
@@ -128,12 +129,18 @@ with st.sidebar:
     else:
         default_provider = available_providers[0] if available_providers else None
     
+    # With more than one key configured, the providers can also be raced
+    provider_choices = available_providers[:]
+    if len(available_providers) > 1:
+        provider_choices.append(AUTO_PROVIDER)
+    
     if default_provider:
         selected_provider = st.selectbox(
             "Choose AI Provider:",
-            available_providers,
-            index=available_providers.index(default_provider),
-            help="Gemini: Reliable and tested. Kimi: Experimental - may have authentication issues."
+            provider_choices,
+            index=provider_choices.index(default_provider),
+            help="Gemini: Reliable and tested. Kimi: Experimental - may have authentication issues. "
+                 "Auto: asks every configured provider at once and keeps the first complete quiz."
         )
         
         # Provider-specific guidance
@@ -188,6 +195,8 @@ with st.sidebar:
                 
                 **If issues persist, switch to Gemini above ⬆️**
                 """)
+        elif selected_provider == AUTO_PROVIDER:
+            st.info(f"⚡ Racing {', '.join(available_providers)} - the first complete quiz wins")
         else:
             st.info(f"Using {selected_provider}")
     
@@ -208,7 +217,7 @@ with st.sidebar:
     with st.expander("🔥 Gemini Free Tier Guide"):
         st.markdown("""
         **Current Limits (2025):**
-        - Gemini 1.5 Flash: 15 RPM, 50 RPD
+        - Gemini 2.5 Flash-Lite: 15 RPM, 1,000 RPD
         - Gemini 2.5 Pro: 5 RPM, 100 RPD
         - Resets: Midnight Pacific Time
         
@@ -249,7 +258,7 @@ with st.sidebar:
     # Current provider info
     with st.expander("ℹ️ About Current Providers"):
         st.markdown("""
-        **Gemini 1.5 Flash:**
+        **Gemini (2.5 Flash-Lite by default):**
         - ✅ Reliable and accurate
         - ❌ Limited free tier (50-100/day)
         - 🔄 Resets midnight Pacific time
@@ -279,49 +288,175 @@ with st.sidebar:
 # ---------------------------
 # Utility Functions
 # ---------------------------
-def extract_text_from_url(url: str) -> tuple[str, str]:
-    """Extract text from URL"""
-    try:
-        if not url.startswith(('http://', 'https://')):
-            return "", "Please enter a valid URL starting with http:// or https://"
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "Connection": "keep-alive",
-        }
-        
-        resp = requests.get(url, headers=headers, timeout=30, allow_redirects=True)
-        
+QUESTION_SPLIT_RE = re.compile(r"(?m)^\s*\d+\.\s+")
+CORRECT_LETTER_RE = re.compile(r"^([A-D])\b", re.IGNORECASE)
+EXPLANATION_LINE_RE = re.compile(r"(?im)^\W*explanation\W*:")
+QUESTIONS_PER_QUIZ = 5
+# Option lines look like "A. text" or "A) text"; checked with a set lookup
+# on the first two characters instead of a regex
+OPTION_LETTERS = ("A", "B", "C", "D")
+OPTION_PREFIXES = frozenset(letter + sep for letter in OPTION_LETTERS for sep in ".)")
+# Display labels for shuffled options, indexed by position
+OPTION_LABELS = tuple(letter + ". " for letter in OPTION_LETTERS)
+
+URL_SCHEMES = ("http://", "https://")
+# (connect, read) - unreachable hosts fail fast instead of holding the run for 30s;
+# with the single connect retry below, a dead host gives up after about 10s
+REQUEST_TIMEOUT = (5, 30)
+# Hosts cached by the shared session and connections kept open per host; Streamlit serves
+# concurrent users from threads, so their fetches and API calls rarely queue
+HTTP_POOL_SIZE = 8
+MAX_PAGE_BYTES = 2_000_000
+# Extracted characters kept per page; the download stops once this much text is found
+MAX_PAGE_TEXT = 8000
+
+# Tokens of page content sent to the AI provider; latency and cost scale with it.
+# Tokens are estimated from characters (~4 per token for English prose), which
+# is close enough for a budget and avoids a count_tokens round trip
+CONTENT_TOKEN_BUDGET = 1000
+CHARS_PER_TOKEN = 4
+
+# Shared session so repeat page fetches and provider API calls reuse pooled
+# TCP/TLS connections. Connect errors and 5xx responses get one quick retry;
+# read timeouts and 429s are not retried (and Retry-After is ignored) so a slow
+# or rate-limited host can't hold the run. read=False re-raises a read timeout
+# as-is, so callers still see ReadTimeout rather than a generic ConnectionError. POSTs are only retried on connect
+# errors, so a quiz request is never sent twice; the final response is still
+# returned so callers can report the status code.
+SESSION = requests.Session()
+# The session is shared by every user of the app, so it must not keep cookies:
+# one user's page fetch would otherwise send them with everyone else's requests
+SESSION.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+_adapter = HTTPAdapter(
+    pool_connections=HTTP_POOL_SIZE,
+    pool_maxsize=HTTP_POOL_SIZE,
+    max_retries=Retry(
+        total=1,
+        connect=1,
+        read=False,
+        backoff_factor=0.3,
+        status_forcelist=[500, 502, 503, 504],
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    ),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+# Sent with page fetches only; the API calls set their own headers.
+# Accept-Encoding is left at requests' default, which adds br when brotli is installed
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+# Text is read only from these tags; <div> is left out because its text just
+# repeats the paragraphs and list items nested inside it. Anything inside a
+# boilerplate tag is skipped.
+CONTENT_TAGS = ["h1", "h2", "h3", "h4", "p", "li"]
+BOILERPLATE_TAGS = ["script", "style", "nav", "footer", "header"]
+# Site chrome that survives tag filtering (cookie banners, login prompts, ...).
+# Only short blocks are checked, so lesson text like "Login Flows let admins..." is kept
+BOILERPLATE_LINE_RE = re.compile(
+    r"^(home\s*[/>›»]|log ?in\b|sign ?(up|in)\b|cookies?\b|accept all\b|skip to\b|©|copyright\b)",
+    re.IGNORECASE,
+)
+BOILERPLATE_MAX_LEN = 60
+WHITESPACE_RE = re.compile(r"\s+")
+
+def collect_page_text(chunks, encoding=None) -> str:
+    """Parse HTML chunks as they arrive and return the readable text, stopping once there is enough"""
+    from lxml import etree
+
+    parser = etree.HTMLPullParser(
+        events=("start", "end"),
+        tag=CONTENT_TAGS + BOILERPLATE_TAGS,
+        encoding=encoding,
+        remove_comments=True,
+        remove_pis=True,
+    )
+
+    def events():
+        received = 0
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from parser.read_events()
+            received += len(chunk)
+            if received >= MAX_PAGE_BYTES:
+                break
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:  # empty document
+            return
+        yield from parser.read_events()
+
+    texts = []
+    seen = set()
+    size = 0
+    boilerplate_depth = 0
+    for event, element in events():
+        if element.tag in BOILERPLATE_TAGS:
+            if event == "start":
+                boilerplate_depth += 1
+            else:
+                boilerplate_depth -= 1
+                # Empty it so its text doesn't show up in an enclosing block
+                element.clear(keep_tail=True)
+        elif event == "end" and not boilerplate_depth:
+            text = WHITESPACE_RE.sub(" ", " ".join(element.itertext())).strip()
+            # Filter out very short text, leftover navigation/legal lines and
+            # repeats (e.g. an <li> wrapping a single <p>)
+            boilerplate = len(text) <= BOILERPLATE_MAX_LEN and BOILERPLATE_LINE_RE.match(text)
+            if len(text) > 10 and text not in seen and not boilerplate:
+                seen.add(text)
+                texts.append(text)
+                size += len(text) + 1
+                if size >= MAX_PAGE_TEXT:
+                    break
+    return "\n".join(texts)[:MAX_PAGE_TEXT]
+
+class PageError(Exception):
+    """A page fetch failed with a message meant for the user"""
+
+# Pages change more often than quizzes need regenerating, so extraction expires sooner.
+# Failures are raised rather than returned, so st.cache_data never stores them
+# and a retry after a 5xx or timeout really refetches.
+@st.cache_data(ttl=1800, max_entries=32, show_spinner=False)
+def fetch_page_text(url: str) -> str:
+    """Fetch a page and return its readable text"""
+    with SESSION.get(
+        url, headers=BROWSER_HEADERS, timeout=REQUEST_TIMEOUT, allow_redirects=True, stream=True
+    ) as resp:
         if resp.status_code == 403:
-            return "", "Access forbidden (403). The website may be blocking automated requests. Try copying the content manually."
+            raise PageError("Access forbidden (403). The website may be blocking automated requests. Try copying the content manually.")
         elif resp.status_code == 404:
-            return "", "Page not found (404). Please check the URL."
+            raise PageError("Page not found (404). Please check the URL.")
         elif resp.status_code != 200:
-            return "", f"HTTP {resp.status_code} error. The website may be temporarily unavailable."
+            raise PageError(f"HTTP {resp.status_code} error. The website may be temporarily unavailable.")
             
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-
-        chunks = []
-        for tag in soup.find_all(["h1", "h2", "h3", "h4", "p", "li", "div"], recursive=True):
-            text = tag.get_text(separator=" ", strip=True)
-            if text and len(text) > 10:  # Filter out very short text
-                chunks.append(text)
         
-        text = "\n".join(chunks).strip()
+        # A charset from the HTTP header wins; otherwise lxml sniffs <meta charset>
+        declared = "charset" in resp.headers.get("Content-Type", "").lower()
+        encoding = resp.encoding if declared else None
         
-        if not text:
-            return "", "No readable content found on this page. Try copying the content manually."
-            
-        return text[:8000], ""  # limit length, no error
+        # Parse while downloading; leaving the block early drops the rest of the transfer
+        text = collect_page_text(resp.iter_content(chunk_size=64 * 1024), encoding)
+    
+    if not text:
+        raise PageError("No readable content found on this page. Try copying the content manually.")
+    return text
+
+def extract_text_from_url(url: str) -> tuple[str, str]:
+    """Extract text from URL"""
+    try:
+        if not url.startswith(URL_SCHEMES):
+            return "", "Please enter a valid URL starting with http:// or https://"
+        
+        return fetch_page_text(url), ""  # no error
         
+    except PageError as e:
+        return "", str(e)
     except requests.exceptions.Timeout:
         return "", "Request timed out. The website may be slow or unresponsive."
     except requests.exceptions.ConnectionError:
@@ -331,9 +466,34 @@ def extract_text_from_url(url: str) -> tuple[str, str]:
     except Exception as e:
         return "", f"Unexpected error: {str(e)}"
 
+def trim_content(text: str, max_tokens: int = CONTENT_TOKEN_BUDGET) -> str:
+    """Drop repeated paragraphs and cut the text down to the prompt's token budget"""
+    budget = max_tokens * CHARS_PER_TOKEN
+    seen = set()
+    kept = []
+    used = 0
+    for para in text.split("\n"):
+        para = para.strip()
+        if not para or para in seen:
+            continue
+        seen.add(para)
+        remaining = budget - used
+        if len(para) > remaining:
+            # Cut the last paragraph at a word boundary rather than mid-word
+            cut = para[:remaining].rsplit(" ", 1)[0] if remaining > 0 else ""
+            if cut:
+                kept.append(cut)
+            break
+        kept.append(para)
+        used += len(para) + 1
+    return "\n".join(kept)
+
 def parse_quiz_from_text(raw_quiz: str):
     """Parse quiz from AI response"""
-    parts = re.split(r"(?m)^\s*\d+\.\s+", raw_quiz)
+    # Every kept question needs a correct-answer line; skip the split on junk output
+    if not raw_quiz or "correct" not in raw_quiz.lower():
+        return []
+    parts = QUESTION_SPLIT_RE.split(raw_quiz)
     parts = [p.strip() for p in parts if p.strip()]
     quiz = []
 
@@ -344,29 +504,46 @@ def parse_quiz_from_text(raw_quiz: str):
 
         question_text = lines[0]
         options = []
-        for ln in lines:
-            m = re.match(r"^([A-D])[\).]\s*(.*)$", ln)
-            if m:
-                options.append(f"{m.group(1)}. {m.group(2)}")
+        letters = []
+        correct_match = None
+        explanation_line = None
+        # Classify every line in a single pass; option lines are the majority
+        for ln in lines[1:]:
+            prefix = ln[:2]
+            if prefix in OPTION_PREFIXES:
+                # Repeated option lines (or a missed question split) must not
+                # produce more options than there are display labels
+                if len(options) >= len(OPTION_LETTERS):
+                    continue
+                letters.append(prefix[0])
+                options.append(ln[2:].lstrip())
+                continue
+            low = ln.lower()
+            if correct_match is None and "correct" in low:
+                correct_match = ln
+            elif explanation_line is None and "explanation" in low:
+                explanation_line = ln
+            if correct_match and explanation_line:
+                break  # Both answer lines follow the options; nothing left to read
 
-        correct_match = next((ln for ln in lines if "correct" in ln.lower()), None)
         correct_letter = None
         if correct_match and ":" in correct_match:
             candidate = correct_match.split(":", 1)[1].strip()
-            m2 = re.match(r"^([A-D])\b", candidate, flags=re.IGNORECASE)
+            m2 = CORRECT_LETTER_RE.match(candidate)
             if m2:
                 correct_letter = m2.group(1).upper()
 
-        explanation_line = next((ln for ln in lines if "explanation" in ln.lower()), None)
         explanation = "No explanation provided."
         if explanation_line and ":" in explanation_line:
             explanation = explanation_line.split(":", 1)[1].strip()
 
-        if question_text and len(options) >= 3 and correct_letter:
+        # Options are stored as plain text with the answer as an index, so
+        # shuffling never has to re-parse "A. ..." labels
+        if question_text and len(options) >= 3 and correct_letter in letters:
             quiz.append({
                 "question": question_text,
                 "options": options,
-                "correct": correct_letter,
+                "correct_idx": letters.index(correct_letter),
                 "explanation": explanation,
             })
 
@@ -377,52 +554,40 @@ def shuffle_quiz(original_quiz):
     if not original_quiz:
         return []
         
-    shuffled_questions = original_quiz[:]
-    random.shuffle(shuffled_questions)
-
     shuffled = []
-    for q in shuffled_questions:
-        opt_texts = []
-        for opt in q["options"]:
-            m = re.match(r"^[A-D][\).]\s*(.*)$", opt)
-            if m:
-                opt_texts.append(m.group(1).strip())
-
-        orig_correct_text = None
-        if q.get("correct"):
-            letter = q["correct"]
-            for opt in q["options"]:
-                if opt.startswith(f"{letter}."):
-                    m2 = re.match(r"^[A-D][\).]\s*(.*)$", opt)
-                    orig_correct_text = m2.group(1).strip() if m2 else opt[2:].strip()
-                    break
-
-        random.shuffle(opt_texts)
+    # random.sample returns a new shuffled list, leaving the original order intact
+    for q in random.sample(original_quiz, len(original_quiz)):
+        opt_texts = q["options"]
+        order = random.sample(range(len(opt_texts)), len(opt_texts))
 
-        new_options = []
-        new_correct_letter = None
-        for idx, txt in enumerate(opt_texts):
-            letter = chr(65 + idx)
-            new_options.append(f"{letter}. {txt}")
-            if orig_correct_text and txt == orig_correct_text:
-                new_correct_letter = letter
+        new_options = [OPTION_LABELS[idx] + opt_texts[orig] for idx, orig in enumerate(order)]
+        new_correct_idx = order.index(q["correct_idx"])
 
         shuffled.append({
             "question": q["question"],
             "options": new_options,
-            "correct": new_correct_letter,
+            # Resolved once here so scoring doesn't rescan the options
+            "correct_option": new_options[new_correct_idx],
             "explanation": q["explanation"]
         })
     return shuffled
 
+def score_quiz(questions, answers):
+    """Score answers against the quiz; returns (score, [(selected, correct_option, is_correct)])"""
+    results = []
+    for i, q in enumerate(questions):
+        selected = answers.get(i)
+        correct_option = q.get("correct_option")
+        results.append((selected, correct_option, selected is not None and selected == correct_option))
+    score = sum(1 for _, _, is_correct in results if is_correct)
+    return score, results
+
 # ---------------------------
 # AI Provider Functions
 # ---------------------------
-def generate_with_gemini(content: str):
-    """Generate quiz using Gemini with enhanced error handling"""
-    try:
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        prompt = f"""You are a quiz generator. Create EXACTLY 5 multiple-choice questions from this content.
+# Fixed instructions live on the model as its system instruction, so each
+# request only carries the page content
+GEMINI_SYSTEM_PROMPT = """You are a quiz generator. Create EXACTLY 5 multiple-choice questions from the content you are given.
 
 STRICT REQUIREMENTS:
 - Generate EXACTLY 5 questions, no more, no less
@@ -430,9 +595,6 @@ STRICT REQUIREMENTS:
 - Specify the correct answer
 - Provide brief explanation
 
-Content:
-{content[:4000]}
-
 Format EXACTLY like this:
 1. Question text here
    A. First option
@@ -454,16 +616,71 @@ Format EXACTLY like this:
 
 IMPORTANT: Return ONLY the 5 questions in the exact format above. No introduction, no conclusion, no extra text."""
 
-        result = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                top_p=0.8,
-                top_k=40,
-                max_output_tokens=3000,  # Increased for 5 questions
-            )
-        )
-        return result.text, None
+# Kimi and OpenAI get the same split: fixed instructions as the system message,
+# page content as the user message, so repeat requests share a cacheable prefix
+CHAT_SYSTEM_PROMPT = """Create exactly 5 multiple-choice questions from the content you are given.
+
+Format each question exactly like this:
+1. Question text
+   A. option
+   B. option
+   C. option
+   D. option
+   Correct Answer: X
+   Explanation: brief explanation
+
+Only return the quiz, no extra text."""
+
+CONTENT_PROMPT_TEMPLATE = """Content:
+{content}"""
+
+# The lite tier has the lowest time-to-first-token, which is what the user waits
+# on; a larger model can be set with the gemini_model secret
+GEMINI_MODEL_NAME = st.secrets.get("gemini_model", os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite"))
+
+@st.cache_resource(show_spinner=False)
+def get_gemini_model(api_key: str, name: str = GEMINI_MODEL_NAME):
+    """Import and configure the Gemini SDK, then create the configured model handle once"""
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(
+        name,
+        system_instruction=GEMINI_SYSTEM_PROMPT,
+        generation_config=genai.types.GenerationConfig(
+            temperature=0.5,  # Enough variety for "New Quiz" while keeping the format steady
+            top_p=0.9,
+            top_k=40,
+            candidate_count=1,
+            max_output_tokens=1200,  # 5 questions run ~800 tokens; caps runaway output
+        ),
+    )
+
+# variant only takes part in the cache key: bumping it asks for a different quiz
+# over the same content without evicting anyone else's cached entries
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def call_gemini(prompt: str, api_key: str, model_name: str = GEMINI_MODEL_NAME, variant: int = 0) -> str:
+    """Send prompt to Gemini and return the raw text (errors are raised, so never cached)"""
+    model = get_gemini_model(api_key, model_name)
+    response = model.generate_content(prompt, stream=True)
+    chunks = []
+    for chunk in response:
+        # A chunk with no parts (e.g. the closing MAX_TOKENS or SAFETY chunk) raises
+        # on .text; keep the text that has already arrived
+        try:
+            chunks.append(chunk.text)
+        except ValueError:
+            continue
+        text = "".join(chunks)
+        # Stop reading once the last question's explanation line is complete
+        labels = list(EXPLANATION_LINE_RE.finditer(text))
+        if len(labels) >= QUESTIONS_PER_QUIZ and "\n" in text[labels[QUESTIONS_PER_QUIZ - 1].end():]:
+            break
+    return "".join(chunks)
+
+def generate_with_gemini(prompt: str, api_key: str, variant: int = 0):
+    """Generate quiz using Gemini with enhanced error handling"""
+    try:
+        return call_gemini(prompt, api_key, variant=variant), None
     except Exception as e:
         error_msg = str(e).lower()
         if "quota" in error_msg or "limit" in error_msg or "exceeded" in error_msg:
@@ -485,7 +702,7 @@ IMPORTANT: Return ONLY the 5 questions in the exact format above. No introductio
         else:
             return None, f"Gemini error: {str(e)}"
 
-def generate_with_kimi(content: str, api_key: str):
+def generate_with_kimi(prompt: str, api_key: str):
     """Generate quiz using Kimi (Moonshot) API - Enhanced debugging"""
     try:
         # Try multiple possible endpoints
@@ -500,46 +717,43 @@ def generate_with_kimi(content: str, api_key: str):
             "User-Agent": "Quiz-Generator/1.0"
         }
         
-        prompt = f"""Create exactly 5 multiple-choice questions from this content:
-
-{content[:4000]}
-
-Format each question exactly like this:
-1. Question text
-   A. option
-   B. option
-   C. option
-   D. option
-   Correct Answer: X
-   Explanation: brief explanation
-
-Only return the quiz, no extra text."""
-
         data = {
             "model": "moonshot-v1-8k", 
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": [
+                {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
             "temperature": 0.7,
             "max_tokens": 2000
         }
         
         last_error = None
         
-        # Try each endpoint
-        for url in endpoints_to_try:
-            try:
-                response = requests.post(url, headers=headers, json=data, timeout=30)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if "choices" in result and len(result["choices"]) > 0:
-                        return result["choices"][0]["message"]["content"], None
-                else:
-                    last_error = f"HTTP {response.status_code} from {url}: {response.text[:200]}"
-                    continue
+        # Try both endpoints at once: a key only works on its own platform, so the
+        # wrong one fails fast instead of holding up the right one for a full timeout
+        pool = ThreadPoolExecutor(max_workers=len(endpoints_to_try))
+        futures = {
+            pool.submit(SESSION.post, url, headers=headers, json=data, timeout=30): url
+            for url in endpoints_to_try
+        }
+        try:
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    response = future.result()
                     
-            except Exception as e:
-                last_error = f"Connection error to {url}: {str(e)}"
-                continue
+                    if response.status_code == 200:
+                        result = response.json()
+                        if "choices" in result and len(result["choices"]) > 0:
+                            return result["choices"][0]["message"]["content"], None
+                    else:
+                        last_error = f"HTTP {response.status_code} from {url}: {response.text[:200]}"
+                        
+                except Exception as e:
+                    last_error = f"Connection error to {url}: {str(e)}"
+        finally:
+            # Return as soon as one endpoint answers; don't wait on the other
+            pool.shutdown(wait=False, cancel_futures=True)
         
         # If all endpoints failed, provide detailed error
         return None, f"""🔧 **Kimi Connection Failed** 
@@ -561,7 +775,7 @@ Only return the quiz, no extra text."""
     except Exception as e:
         return None, f"❌ **Kimi Error**: {str(e)}\n\n💡 **Switch to Gemini** for reliable service."
 
-def generate_with_openai(content: str, api_key: str):
+def generate_with_openai(prompt: str, api_key: str):
     """Generate quiz using OpenAI"""
     try:
         headers = {
@@ -569,30 +783,18 @@ def generate_with_openai(content: str, api_key: str):
             "Content-Type": "application/json"
         }
         
-        prompt = f"""Create exactly 5 multiple-choice questions from this content:
-
-{content[:4000]}
-
-Format each question exactly like this:
-1. Question text
-   A. option
-   B. option
-   C. option
-   D. option
-   Correct Answer: X
-   Explanation: brief explanation
-
-Only return the quiz, no extra text."""
-
         data = {
             "model": "gpt-3.5-turbo",
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": [
+                {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
             "temperature": 0.7,
             "max_tokens": 1500
         }
         
-        response = requests.post("https://api.openai.com/v1/chat/completions", 
-                               headers=headers, json=data, timeout=30)
+        response = SESSION.post("https://api.openai.com/v1/chat/completions", 
+                              headers=headers, json=data, timeout=30)
         if response.status_code == 200:
             result = response.json()
             return result["choices"][0]["message"]["content"], None
@@ -602,19 +804,63 @@ Only return the quiz, no extra text."""
     except Exception as e:
         return None, f"OpenAI error: {str(e)}"
 
-def generate_quiz(content: str, provider: str, providers: dict):
-    """Generate quiz using selected provider"""
+def request_quiz(prompt: str, provider: str, providers: dict, variant: int = 0):
+    """Ask one provider for a quiz; returns (raw_quiz, error)"""
+    if provider == "Gemini" and GEMINI_AVAILABLE:
+        return generate_with_gemini(prompt, providers[provider]["key"], variant)
+    elif provider == "Kimi (Moonshot)":
+        return generate_with_kimi(prompt, providers[provider]["key"])
+    elif provider == "OpenAI":
+        return generate_with_openai(prompt, providers[provider]["key"])
+    return None, f"{provider} is not available."
+
+def race_providers(prompt: str, providers: dict, names: list[str], variant: int = 0):
+    """Ask several providers at once; returns (raw_quiz, error, provider) for the first usable quiz"""
+    ctx = get_script_run_ctx()
+
+    def attempt(name):
+        # call_gemini is an st.cache_data function, which expects the script's run context
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return request_quiz(prompt, name, providers, variant)
+
+    pool = ThreadPoolExecutor(max_workers=len(names))
+    futures = {pool.submit(attempt, name): name for name in names}
+    errors = []
+    best = None  # (question count, raw_quiz, provider) of the largest partial quiz
+    try:
+        for future in as_completed(futures):
+            name = futures[future]
+            raw_quiz, error = future.result()
+            count = len(parse_quiz_from_text(raw_quiz)) if raw_quiz else 0
+            # Stop at the first quiz missing at most one question
+            if count >= QUESTIONS_PER_QUIZ - 1:
+                return raw_quiz, None, name
+            if count and (best is None or count > best[0]):
+                best = (count, raw_quiz, name)
+            errors.append(f"{name}: {error or 'incomplete quiz'}")
+    finally:
+        # The slower providers finish in the background; nothing waits on them
+        pool.shutdown(wait=False, cancel_futures=True)
+    # Nothing complete arrived; a partial quiz still beats an error, as in single-provider mode
+    if best:
+        return best[1], None, best[2]
+    return None, "All providers failed.\n\n" + "\n\n".join(errors), AUTO_PROVIDER
+
+def generate_quiz(content: str, provider: str, providers: dict, variant: int = 0):
+    """Generate quiz using selected provider (a new variant skips cached responses)"""
     if not content or len(content.strip()) < 50:
         st.error("Content too short. Please provide more content.")
         return []
     
+    # Trim and wrap the content once; every provider gets the same user prompt
+    prompt = CONTENT_PROMPT_TEMPLATE.format(content=trim_content(content))
+    
     with st.spinner(f"Generating quiz using {provider}..."):
-        if provider == "Gemini" and GEMINI_AVAILABLE:
-            raw_quiz, error = generate_with_gemini(content)
-        elif provider == "Kimi (Moonshot)":
-            raw_quiz, error = generate_with_kimi(content, providers[provider]["key"])
-        elif provider == "OpenAI":
-            raw_quiz, error = generate_with_openai(content, providers[provider]["key"])
+        if provider == AUTO_PROVIDER:
+            names = [name for name, config in providers.items() if config["key"]]
+            raw_quiz, error, provider = race_providers(prompt, providers, names, variant)
+        elif provider in providers:
+            raw_quiz, error = request_quiz(prompt, provider, providers, variant)
         else:
             return []
     
@@ -689,8 +935,8 @@ def generate_quiz(content: str, provider: str, providers: dict):
                 st.text(raw_quiz[:1000] + "..." if len(raw_quiz) > 1000 else raw_quiz)
         return []
     
-    if len(quiz) < 5:
-        st.warning(f"⚠️ Only generated {len(quiz)} questions instead of 5. The AI response may have been incomplete.")
+    if len(quiz) < QUESTIONS_PER_QUIZ:
+        st.warning(f"⚠️ Only generated {len(quiz)} questions instead of {QUESTIONS_PER_QUIZ}. The AI response may have been incomplete.")
         # Show debug info
         with st.expander("🔍 Debug: AI Response Analysis"):
             st.write(f"**Questions found**: {len(quiz)}")
@@ -699,7 +945,8 @@ def generate_quiz(content: str, provider: str, providers: dict):
                 st.text_area("Raw response:", raw_quiz, height=200)
     
     st.success(f"✅ Generated {len(quiz)} questions using {provider}!")
-    return {"original": quiz, "shuffled": shuffle_quiz(quiz)}
+    # Keep the provider that actually answered, which Auto only knows at this point
+    return {"original": quiz, "shuffled": shuffle_quiz(quiz), "provider": provider}
 
 # ---------------------------
 # Session State
@@ -710,10 +957,50 @@ if "page_text" not in st.session_state:
     st.session_state.page_text = ""
 if "quiz" not in st.session_state:
     st.session_state.quiz = {}
-if "answers" not in st.session_state:
-    st.session_state.answers = {}
 if "submitted" not in st.session_state:
     st.session_state.submitted = False
+if "quiz_variant" not in st.session_state:
+    st.session_state.quiz_variant = 0
+
+def clear_answer_keys():
+    """Drop the per-question radio widget state (keys q0, q1, ...)"""
+    # Radios are only ever created for the current quiz, so its length bounds the keys
+    for i in range(len(st.session_state.quiz.get("shuffled", []))):
+        st.session_state.pop(f"q{i}", None)
+
+def current_answers(count: int) -> dict:
+    """Read the selected option for each question straight from its radio widget"""
+    return {i: st.session_state.get(f"q{i}") for i in range(count)}
+
+def reset_quiz_state(quiz):
+    """Swap in a quiz and drop every answer left over from the previous one"""
+    clear_answer_keys()
+    st.session_state.quiz = quiz
+    st.session_state.submitted = False
+
+def clear_all_state():
+    """Reset the extracted content and quiz, keeping the chosen input method"""
+    input_mode = st.session_state.get("input_mode")
+    st.session_state.clear()
+    # The radio is keyed on input_mode, so restoring the key keeps its selection
+    if input_mode:
+        st.session_state.input_mode = input_mode
+    st.rerun()
+
+def run_generation(fresh: bool = False) -> bool:
+    """Generate a quiz from the current content and make it the active quiz"""
+    if fresh:
+        # "New Quiz" must not be served the cached quiz for the same content
+        st.session_state.quiz_variant += 1
+    result = generate_quiz(
+        st.session_state.page_text, selected_provider, providers, variant=st.session_state.quiz_variant
+    )
+    if result:
+        reset_quiz_state(result)
+    else:
+        # Don't hand an unparseable cached response back on the next attempt
+        st.session_state.quiz_variant += 1
+    return bool(result)
 
 # ---------------------------
 # Main Interface
@@ -724,10 +1011,11 @@ if not available_providers:
     st.stop()
 
 # Input method selection
-st.session_state.input_mode = st.radio(
+st.radio(
     "Choose input method:", 
     ["Paste URL", "Paste Text"], 
-    horizontal=True
+    horizontal=True,
+    key="input_mode"
 )
 
 # URL input
@@ -752,10 +1040,7 @@ if st.session_state.input_mode == "Paste URL":
     
     with col2:
         if st.button("🗑️ Clear"):
-            for key in ["page_text", "url", "quiz", "answers", "submitted"]:
-                if key in st.session_state:
-                    del st.session_state[key]
-            st.rerun()
+            clear_all_state()
 
     if st.session_state.page_text:
         with st.expander("📖 Preview extracted text", expanded=False):
@@ -783,10 +1068,7 @@ else:
     )
     
     if st.button("🗑️ Clear"):
-        for key in ["page_text", "quiz", "answers", "submitted"]:
-            if key in st.session_state:
-                del st.session_state[key]
-        st.rerun()
+        clear_all_state()
 
 # Generate quiz
 st.markdown("---")
@@ -794,12 +1076,8 @@ if st.button("🎯 Generate Quiz", type="primary", disabled=not st.session_state
     if not st.session_state.page_text:
         st.warning("Please provide content first.")
     else:
-        result = generate_quiz(st.session_state.page_text, selected_provider, providers)
-        if result:
-            st.session_state.quiz = result
-            st.session_state.answers = {}
-            st.session_state.submitted = False
-            st.rerun()
+        # The quiz section below renders the new quiz in this same run
+        run_generation()
 
 # Quiz display
 if st.session_state.quiz and "shuffled" in st.session_state.quiz:
@@ -808,72 +1086,55 @@ if st.session_state.quiz and "shuffled" in st.session_state.quiz:
     
     shuffled = st.session_state.quiz["shuffled"]
     
-    for i, q in enumerate(shuffled):
-        st.write(f"**Q{i+1}: {q['question']}**")
-        selected = st.radio(
-            f"Select answer for Q{i+1}:",
-            q["options"],
-            key=f"q{i}",
-            index=None
-        )
-        st.session_state.answers[i] = selected
+    # Radio clicks inside a form don't rerun the script; only Submit does
+    with st.form("quiz_form"):
+        for i, q in enumerate(shuffled):
+            st.write(f"**Q{i+1}: {q['question']}**")
+            st.radio(
+                f"Select answer for Q{i+1}:",
+                q["options"],
+                key=f"q{i}",
+                index=None
+            )
+        
+        submit_clicked = st.form_submit_button("✅ Submit Answers", type="primary")
+    
+    if submit_clicked:
+        unanswered = [i+1 for i, selected in current_answers(len(shuffled)).items() if not selected]
+        if unanswered:
+            st.warning(f"Please answer: Q{', Q'.join(map(str, unanswered))}")
+        else:
+            # Results render further down in this same run
+            st.session_state.submitted = True
     
     # Control buttons
-    col1, col2, col3 = st.columns(3)
+    col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("✅ Submit Answers", type="primary"):
-            unanswered = [i+1 for i in range(len(shuffled)) if not st.session_state.answers.get(i)]
-            if unanswered:
-                st.warning(f"Please answer: Q{', Q'.join(map(str, unanswered))}")
-            else:
-                st.session_state.submitted = True
-                st.rerun()
-    
-    with col2:
         if st.button("🔄 Retake Quiz"):
             # Reshuffle and clear answers
-            st.session_state.quiz["shuffled"] = shuffle_quiz(st.session_state.quiz["original"])
-            for i in range(20):
-                if f"q{i}" in st.session_state:
-                    del st.session_state[f"q{i}"]
-            st.session_state.answers = {}
-            st.session_state.submitted = False
+            original = st.session_state.quiz["original"]
+            reset_quiz_state({**st.session_state.quiz, "shuffled": shuffle_quiz(original)})
             st.rerun()
     
-    with col3:
+    with col2:
         if st.button("🎲 New Quiz"):
-            if st.session_state.page_text:
-                # Clear old data
-                for i in range(20):
-                    if f"q{i}" in st.session_state:
-                        del st.session_state[f"q{i}"]
-                
-                result = generate_quiz(st.session_state.page_text, selected_provider, providers)
-                if result:
-                    st.session_state.quiz = result
-                    st.session_state.answers = {}
-                    st.session_state.submitted = False
-                    st.rerun()
+            if st.session_state.page_text and run_generation(fresh=True):
+                st.rerun()
 
 # Results display
 if st.session_state.submitted and st.session_state.quiz:
     st.markdown("---")
     st.write("### 🎯 Quiz Results")
     
-    score = 0
     shuffled = st.session_state.quiz["shuffled"]
+    score, results = score_quiz(shuffled, current_answers(len(shuffled)))
     
-    for i, q in enumerate(shuffled):
-        selected = st.session_state.answers.get(i)
-        correct_letter = q.get("correct")
-        correct_option = next((opt for opt in q["options"] if opt.startswith(f"{correct_letter}.")), None)
-        
+    for i, (q, (selected, correct_option, is_correct)) in enumerate(zip(shuffled, results)):
         st.write(f"**Q{i+1}: {q['question']}**")
         
-        if selected == correct_option:
+        if is_correct:
             st.success(f"✅ **Correct!** {selected}")
-            score += 1
         else:
             st.error(f"❌ **Wrong.** You chose: {selected or 'No answer'}")
             if correct_option:
@@ -896,4 +1157,4 @@ if st.session_state.submitted and st.session_state.quiz:
         st.info("📚 Keep studying and try again!")
     
     # Provider credit
-    st.info(f"Quiz generated by: **{selected_provider}**")
\ No newline at end of file
+    st.info(f"Quiz generated by: **{st.session_state.quiz.get('provider', selected_provider)}**")
\ No newline at end of file
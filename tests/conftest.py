@@ -0,0 +1,19 @@
+import importlib
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """Import app.py in Streamlit bare mode with a throwaway provider key"""
+    root = tmp_path_factory.mktemp("app")
+    (root / ".streamlit").mkdir()
+    (root / ".streamlit" / "secrets.toml").write_text('kimi_api_key = "test"\n')
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        module = importlib.import_module("app")
+    finally:
+        os.chdir(cwd)
+    return module
@@ -0,0 +1,66 @@
+def collect(app, html, chunk_size=16):
+    data = html.encode()
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    return app.collect_page_text(iter(chunks), "utf-8")
+
+
+def test_skips_navigation_and_scripts(app):
+    html = (
+        "<html><head><script>var tracking = 'should not appear';</script></head><body>"
+        "<nav><ul><li>Navigation link one</li></ul></nav>"
+        "<h1>Apex Basics Module</h1>"
+        "<p>Apex is a strongly typed programming language.</p>"
+        "<footer><p>Footer text that is long enough</p></footer>"
+        "</body></html>"
+    )
+    text = collect(app, html)
+    assert text.split("\n") == ["Apex Basics Module", "Apex is a strongly typed programming language."]
+
+
+def test_repeated_blocks_are_kept_once(app):
+    html = (
+        "<ul><li><p>Triggers run before or after DML.</p></li></ul>"
+        "<p>Triggers run before or after DML.</p>"
+    )
+    assert collect(app, html) == "Triggers run before or after DML."
+
+
+def test_short_boilerplate_lines_are_dropped(app):
+    html = (
+        "<p>Sign in to your account</p>"
+        "<p>Accept all cookies</p>"
+        "<p>Copyright 2024 Salesforce</p>"
+        "<p>Flows automate business processes.</p>"
+    )
+    assert collect(app, html) == "Flows automate business processes."
+
+
+def test_stops_at_the_text_cap(app):
+    paragraph = "Lightning components render quickly on every page. "
+    html = "".join(f"<p>{i} {paragraph * 5}</p>" for i in range(200))
+    assert len(collect(app, html, chunk_size=4096)) <= app.MAX_PAGE_TEXT
+
+
+def test_trim_content_drops_repeats_and_respects_budget(app):
+    text = "First paragraph here.\nFirst paragraph here.\n\nSecond one follows."
+    assert app.trim_content(text) == "First paragraph here.\nSecond one follows."
+
+    trimmed = app.trim_content("word " * 100, max_tokens=10)
+    assert len(trimmed) <= 10 * app.CHARS_PER_TOKEN
+    assert not trimmed.endswith(" ")
+    assert set(trimmed.split()) == {"word"}
+
+
+def test_lesson_text_starting_like_boilerplate_is_kept(app):
+    paragraphs = [
+        "Login Flows let admins add custom screens and logic to the login process.",
+        "Sign in with Salesforce lets users reach connected apps with one identity.",
+        "Cookies are small files that a browser stores on behalf of a website.",
+        "Copyright law protects original works of authorship, including course content.",
+    ]
+    html = "".join(f"<p>{p}</p>" for p in paragraphs)
+    assert collect(app, html).split("\n") == paragraphs
+
+
+def test_cookie_needs_a_word_boundary(app):
+    assert collect(app, "<p>Cookiecutter templates</p>") == "Cookiecutter templates"
@@ -0,0 +1,67 @@
+RAW_QUIZ = """1. What is a record?
+A. A row
+B. A field
+C. An object
+D. A report
+Correct Answer: A
+Explanation: Records are rows.
+
+2. What does SOQL query?
+A) Records
+B) Files
+C) Styles
+D) Images
+Correct Answer: A
+Explanation: SOQL queries records.
+"""
+
+
+def test_parses_questions_with_correct_index(app):
+    quiz = app.parse_quiz_from_text(RAW_QUIZ)
+    assert [q["question"] for q in quiz] == ["What is a record?", "What does SOQL query?"]
+    assert quiz[0]["options"] == ["A row", "A field", "An object", "A report"]
+    assert quiz[1]["correct_idx"] == 0
+    assert quiz[1]["explanation"] == "SOQL queries records."
+
+
+def test_extra_option_lines_are_capped(app):
+    raw = (
+        "1. What is a record?\n"
+        "A. A row\n"
+        "B. A field\n"
+        "C. An object\n"
+        "D. A report\n"
+        "A. A row\n"
+        "Correct Answer: A\n"
+        "Explanation: Records are rows.\n"
+    )
+    quiz = app.parse_quiz_from_text(raw)
+    assert len(quiz) == 1
+    assert len(quiz[0]["options"]) == len(app.OPTION_LETTERS)
+    assert quiz[0]["correct_idx"] == 0
+
+    shuffled = app.shuffle_quiz(quiz)
+    assert len(shuffled[0]["options"]) == len(app.OPTION_LABELS)
+
+
+def test_correct_answer_follows_the_shuffle(app):
+    quiz = app.parse_quiz_from_text(RAW_QUIZ)
+    for _ in range(20):
+        shuffled = app.shuffle_quiz(quiz)
+        by_question = {q["question"]: q for q in quiz}
+        for q in shuffled:
+            original = by_question[q["question"]]
+            assert q["correct_option"][3:] == original["options"][original["correct_idx"]]
+            assert [opt[:3] for opt in q["options"]] == list(app.OPTION_LABELS)
+
+
+def test_score_quiz_counts_only_correct_answers(app):
+    shuffled = app.shuffle_quiz(app.parse_quiz_from_text(RAW_QUIZ))
+    wrong = next(opt for opt in shuffled[1]["options"] if opt != shuffled[1]["correct_option"])
+    score, results = app.score_quiz(shuffled, {0: shuffled[0]["correct_option"], 1: wrong})
+    assert score == 1
+    assert [is_correct for _, _, is_correct in results] == [True, False]
+
+    score, results = app.score_quiz(shuffled, {})
+    assert score == 0
+    assert results[0][0] is None
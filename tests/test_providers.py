@@ -0,0 +1,68 @@
+from test_parse_quiz import RAW_QUIZ
+
+PROVIDERS = {"Gemini": {"key": "g"}, "Kimi (Moonshot)": {"key": "k"}}
+
+
+def fake_request_quiz(replies):
+    def request_quiz(prompt, name, providers, variant=0):
+        return replies[name]
+    return request_quiz
+
+
+def test_race_returns_the_first_complete_quiz(app, monkeypatch):
+    full = "\n\n".join(
+        RAW_QUIZ.split("\n\n")[0].replace("1.", f"{n}.", 1) for n in range(1, app.QUESTIONS_PER_QUIZ + 1)
+    )
+    monkeypatch.setattr(app, "request_quiz", fake_request_quiz({
+        "Gemini": (None, "quota exceeded"),
+        "Kimi (Moonshot)": (full, None),
+    }))
+    raw_quiz, error, provider = app.race_providers("prompt", PROVIDERS, list(PROVIDERS))
+    assert (raw_quiz, error, provider) == (full, None, "Kimi (Moonshot)")
+
+
+def test_race_falls_back_to_the_largest_partial_quiz(app, monkeypatch):
+    one_question = RAW_QUIZ.split("\n\n")[0]
+    monkeypatch.setattr(app, "request_quiz", fake_request_quiz({
+        "Gemini": (one_question, None),
+        "Kimi (Moonshot)": (RAW_QUIZ, None),
+    }))
+    raw_quiz, error, provider = app.race_providers("prompt", PROVIDERS, list(PROVIDERS))
+    assert (raw_quiz, error, provider) == (RAW_QUIZ, None, "Kimi (Moonshot)")
+
+
+def test_race_reports_every_failure(app, monkeypatch):
+    monkeypatch.setattr(app, "request_quiz", fake_request_quiz({
+        "Gemini": (None, "quota exceeded"),
+        "Kimi (Moonshot)": ("not a quiz", None),
+    }))
+    raw_quiz, error, provider = app.race_providers("prompt", PROVIDERS, list(PROVIDERS))
+    assert raw_quiz is None and provider == app.AUTO_PROVIDER
+    assert "Gemini: quota exceeded" in error
+    assert "Kimi (Moonshot): incomplete quiz" in error
+
+
+class FakeChunk:
+    def __init__(self, text=None):
+        self._text = text
+
+    @property
+    def text(self):
+        # Mirrors the SDK, which raises for chunks that carry no parts
+        if self._text is None:
+            raise ValueError("The response.text quick accessor requires a valid Part")
+        return self._text
+
+
+class FakeModel:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def generate_content(self, prompt, stream=False):
+        return iter(self.chunks)
+
+
+def test_gemini_keeps_text_when_the_last_chunk_has_no_parts(app, monkeypatch):
+    chunks = [FakeChunk(RAW_QUIZ[:50]), FakeChunk(RAW_QUIZ[50:]), FakeChunk()]
+    monkeypatch.setattr(app, "get_gemini_model", lambda api_key, name: FakeModel(chunks))
+    assert app.call_gemini("max tokens prompt", "g") == RAW_QUIZ